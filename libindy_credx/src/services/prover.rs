@@ -171,6 +171,9 @@ impl Prover {
         let non_credential_schema = build_non_credential_schema()?;
 
         let mut identifiers: Vec<Identifier> = Vec::with_capacity(credentials_for_proving.len());
+        // sub-proofs are added one at a time: the CL commitments are computed inside
+        // the stateful ProofBuilder, so there is no independent per-credential work
+        // to run in parallel
         for (cred_key, (req_attrs_for_cred, req_predicates_for_cred)) in credentials_for_proving {
             let credential = credentials.get(cred_key.cred_id.as_str()).ok_or_else(|| {
                 input_err(format!(
@@ -4,6 +4,9 @@ use std::cell::RefCell;
 use std::fs::File;
 use std::io::{Read, Seek, SeekFrom, Write};
 use std::path::PathBuf;
+use std::sync::{Arc, Mutex};
+
+use memmap2::Mmap;
 
 use super::{
     Digest, RevocationTailsAccessor, RevocationTailsGenerator, Sha256, Tail, UrsaCryptoError,
@@ -127,6 +130,66 @@ impl TailsReaderImpl for TailsFileReader {
     }
 }
 
+/// A memory-mapped tails file which may be shared between readers
+#[derive(Clone, Debug)]
+pub struct TailsFileMap {
+    path: String,
+    data: Arc<Mmap>,
+    hash: Arc<Mutex<Option<Vec<u8>>>>,
+}
+
+impl TailsFileMap {
+    pub fn open(path: &str) -> IndyResult<Self> {
+        let file = File::open(path)?;
+        // SAFETY: the mapping is only valid while the file is left untouched.
+        // Tails files are written once and never modified afterwards, but
+        // truncating or rewriting the file while it is mapped is undefined
+        // behaviour (typically SIGBUS on access to the missing pages).
+        let data = unsafe { Mmap::map(&file)? };
+        Ok(Self {
+            path: path.to_owned(),
+            data: Arc::new(data),
+            hash: Arc::new(Mutex::new(None)),
+        })
+    }
+
+    pub fn path(&self) -> &str {
+        self.path.as_str()
+    }
+
+    pub fn reader(&self) -> TailsReader {
+        TailsReader::new(self.clone())
+    }
+}
+
+impl TailsReaderImpl for TailsFileMap {
+    fn hash(&mut self) -> IndyResult<Vec<u8>> {
+        // the cached hash is shared by every reader created from this map
+        let mut hash = self
+            .hash
+            .lock()
+            .map_err(|_| err_msg(IndyErrorKind::InvalidState, "Tails hash lock poisoned"))?;
+        if hash.is_none() {
+            let mut hasher = Sha256::default();
+            hasher.input(&self.data[..]);
+            hash.replace(hasher.result().to_vec());
+        }
+        Ok(hash.as_ref().unwrap().clone())
+    }
+
+    fn read(&mut self, size: usize, offset: usize) -> IndyResult<Vec<u8>> {
+        self.data
+            .get(offset..offset + size)
+            .map(|buf| buf.to_vec())
+            .ok_or_else(|| {
+                err_msg(
+                    IndyErrorKind::IOError,
+                    format!("Tails file is too short: {}", self.path),
+                )
+            })
+    }
+}
+
 pub trait TailsWriter: std::fmt::Debug {
     fn write(&mut self, generator: &mut RevocationTailsGenerator) -> IndyResult<(String, String)>;
 }
@@ -91,6 +91,9 @@ impl Verifier {
         let mut proof_verifier = CryptoVerifier::new_proof_verifier()?;
         let non_credential_schema = build_non_credential_schema()?;
 
+        // ursa's ProofVerifier checks each sub-proof's equations internally and
+        // exposes neither the group elements nor the equations, so sub-proofs
+        // cannot be batched into a single multi-scalar multiplication here
         for sub_proof_index in 0..full_proof.identifiers.len() {
             let identifier = full_proof.identifiers[sub_proof_index].clone();
 
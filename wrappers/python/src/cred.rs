@@ -1,26 +1,51 @@
+use std::collections::HashSet;
+
 use pyo3::class::PyObjectProtocol;
 use pyo3::exceptions::ValueError;
 use pyo3::prelude::*;
 use pyo3::types::{PyString, PyType};
 use pyo3::wrap_pyfunction;
+use rayon::prelude::*;
 
+use indy_credx::common::error::IndyResult;
 use indy_credx::domain::credential::{Credential, CredentialValues};
+use indy_credx::domain::revocation_registry::RevocationRegistry;
+use indy_credx::domain::revocation_registry_definition::{
+    IssuanceType, RevocationRegistryDefinition,
+};
 use indy_credx::services::issuer::{CredentialRevocationConfig, Issuer};
 use indy_credx::services::prover::Prover;
-use indy_credx::services::tails::TailsFileReader;
+use indy_credx::services::{MasterSecret, RevocationKeyPrivate};
 
 use crate::buffer::PySafeBuffer;
 use crate::cred_def::{PyCredentialDefinition, PyCredentialPrivateKey};
 use crate::cred_offer::PyCredentialOffer;
 use crate::cred_request::{PyCredentialRequest, PyCredentialRequestMetadata};
 use crate::error::PyIndyResult;
-use crate::helpers::{PyAcceptBufferArg, PyAcceptJsonArg, PyJsonSafeBuffer};
+use crate::helpers::{run_threaded, PyAcceptBufferArg, PyAcceptJsonArg, PyJsonSafeBuffer};
 use crate::master_secret::PyMasterSecret;
 use crate::rev_reg::{
     PyRevocationPrivateKey, PyRevocationRegistry, PyRevocationRegistryDefinition,
-    PyRevocationRegistryDelta,
+    PyRevocationRegistryDelta, PyTailsArg,
 };
 
+/// The parts of a credential needed to read its revocation index, so the
+/// signature values do not need to be parsed
+#[derive(Deserialize)]
+struct CredentialRevocationIndex {
+    signature: CredentialSignatureIndex,
+}
+
+#[derive(Deserialize)]
+struct CredentialSignatureIndex {
+    r_credential: Option<NonRevocationSignatureIndex>,
+}
+
+#[derive(Deserialize)]
+struct NonRevocationSignatureIndex {
+    i: u32,
+}
+
 #[pyclass(name=Credential)]
 pub struct PyCredential {
     pub inner: Py<PySafeBuffer>,
@@ -33,6 +58,16 @@ impl PyCredential {
         Ok(self.inner.to_object(py))
     }
 
+    #[getter]
+    pub fn cred_rev_id(&self, py: Python) -> PyResult<Option<u32>> {
+        let info = self
+            .inner
+            .as_ref(py)
+            .deserialize::<CredentialRevocationIndex>()
+            .map_py_err_msg(|| "Error parsing Credential as JSON")?;
+        Ok(info.signature.r_credential.map(|r_cred| r_cred.i))
+    }
+
     #[classmethod]
     pub fn from_json(_cls: &PyType, py: Python, json: &PyString) -> PyResult<Self> {
         <Self as PyJsonSafeBuffer>::from_json_insecure(py, json)
@@ -63,6 +98,47 @@ impl PyJsonSafeBuffer for PyCredential {
     }
 }
 
+#[pyclass(name=CredentialValues)]
+#[serde(transparent)]
+#[derive(Serialize, Deserialize)]
+pub struct PyCredentialValues {
+    pub inner: CredentialValues,
+}
+
+#[pymethods]
+impl PyCredentialValues {
+    #[classmethod]
+    pub fn from_json(_cls: &PyType, json: &PyString) -> PyResult<Self> {
+        let inner = serde_json::from_str::<CredentialValues>(&json.to_string()?)
+            .map_py_err_msg(|| "Error parsing credential values JSON")?;
+        Ok(Self { inner })
+    }
+
+    pub fn to_json(&self) -> PyResult<String> {
+        Ok(serde_json::to_string(&self.inner).map_py_err()?)
+    }
+}
+
+#[pyproto]
+impl PyObjectProtocol for PyCredentialValues {
+    fn __repr__(&self) -> PyResult<String> {
+        Ok(format!("CredentialValues({:p})", self))
+    }
+}
+
+impl From<CredentialValues> for PyCredentialValues {
+    fn from(value: CredentialValues) -> Self {
+        Self { inner: value }
+    }
+}
+
+impl std::ops::Deref for PyCredentialValues {
+    type Target = CredentialValues;
+    fn deref(&self) -> &Self::Target {
+        &self.inner
+    }
+}
+
 #[pyfunction]
 /// Creates a new credential
 pub fn create_credential(
@@ -71,39 +147,161 @@ pub fn create_credential(
     cred_private_key: PyAcceptBufferArg<PyCredentialPrivateKey>,
     cred_offer: PyAcceptJsonArg<PyCredentialOffer>,
     cred_request: PyAcceptJsonArg<PyCredentialRequest>,
-    cred_values: String,
+    cred_values: PyAcceptJsonArg<PyCredentialValues>,
     /* ^ FIXME add helper to prepare credential values (w/attribute encoding),
     and pass in safe buffer here */
     rev_reg_def: Option<PyAcceptJsonArg<PyRevocationRegistryDefinition>>,
     rev_reg: Option<PyAcceptJsonArg<PyRevocationRegistry>>,
     rev_reg_key: Option<PyAcceptBufferArg<PyRevocationPrivateKey>>,
     rev_reg_idx: Option<u32>,
-    tails_file_path: Option<String>,
+    tails: Option<PyTailsArg>,
 ) -> PyResult<(
     PyCredential,
     Option<PyRevocationRegistry>,
     Option<PyRevocationRegistryDelta>,
 )> {
-    let cred_values =
-        serde_json::from_str::<CredentialValues>(cred_values.as_ref()).map_py_err()?;
     let cred_private_key = &cred_private_key.extract_json(py)?;
     let rev_reg_key = rev_reg_key.map(|key| key.extract_json(py)).transpose()?;
-    let revocation_config = match (
-        &rev_reg_def,
-        &rev_reg,
-        &rev_reg_key,
+    let revocation_config = revocation_config(
+        rev_reg_def.as_ref().map(|def| &def.inner),
+        rev_reg.as_ref().map(|reg| &reg.inner),
+        rev_reg_key.as_ref(),
         rev_reg_idx,
-        &tails_file_path,
-    ) {
-        (None, None, None, None, None) => None,
-        (Some(reg_def), Some(registry), Some(registry_key), Some(registry_idx), Some(path)) => {
-            Some(CredentialRevocationConfig {
+        tails.as_ref(),
+    )?;
+    let (credential, rev_reg, delta) = run_threaded(py, move || {
+        Issuer::new_credential(
+            &cred_def,
+            &cred_private_key,
+            &cred_offer,
+            &cred_request,
+            &cred_values,
+            revocation_config,
+        )
+    })
+    .map_py_err()?;
+    Ok((
+        PyCredential::embed_json(py, &credential)?,
+        rev_reg.map(|reg| PyRevocationRegistry::from(reg)),
+        delta.map(|delta| PyRevocationRegistryDelta::from(delta)),
+    ))
+}
+
+#[pyfunction]
+/// Creates a new credential and processes it for the holder
+///
+/// Equivalent to `create_credential` followed by `process_credential`, without
+/// passing the unprocessed credential back through Python.
+pub fn issue_and_process(
+    py: Python,
+    cred_def: PyAcceptJsonArg<PyCredentialDefinition>,
+    cred_private_key: PyAcceptBufferArg<PyCredentialPrivateKey>,
+    cred_offer: PyAcceptJsonArg<PyCredentialOffer>,
+    cred_request: PyAcceptJsonArg<PyCredentialRequest>,
+    cred_request_metadata: PyAcceptJsonArg<PyCredentialRequestMetadata>,
+    master_secret: PyAcceptBufferArg<PyMasterSecret>,
+    cred_values: PyAcceptJsonArg<PyCredentialValues>,
+    rev_reg_def: Option<PyAcceptJsonArg<PyRevocationRegistryDefinition>>,
+    rev_reg: Option<PyAcceptJsonArg<PyRevocationRegistry>>,
+    rev_reg_key: Option<PyAcceptBufferArg<PyRevocationPrivateKey>>,
+    rev_reg_idx: Option<u32>,
+    tails: Option<PyTailsArg>,
+) -> PyResult<(
+    PyCredential,
+    Option<PyRevocationRegistry>,
+    Option<PyRevocationRegistryDelta>,
+)> {
+    let cred_private_key = &cred_private_key.extract_json(py)?;
+    // the master secret is parsed on the worker thread, borrowing the handle's buffer
+    let master_secret = master_secret.inner.as_ref(py);
+    let rev_reg_key = rev_reg_key.map(|key| key.extract_json(py)).transpose()?;
+    let rev_reg_def = rev_reg_def.as_ref().map(|def| &def.inner);
+    let revocation_config = revocation_config(
+        rev_reg_def,
+        rev_reg.as_ref().map(|reg| &reg.inner),
+        rev_reg_key.as_ref(),
+        rev_reg_idx,
+        tails.as_ref(),
+    )?;
+    let (credential, rev_reg, delta) = run_threaded(py, move || {
+        let master_secret = master_secret.deserialize::<MasterSecret>()?;
+        let (mut credential, rev_reg, delta) = Issuer::new_credential(
+            &cred_def,
+            &cred_private_key,
+            &cred_offer,
+            &cred_request,
+            &cred_values,
+            revocation_config,
+        )?;
+        Prover::process_credential(
+            &mut credential,
+            &cred_request_metadata,
+            &master_secret,
+            &cred_def,
+            rev_reg_def,
+        )?;
+        IndyResult::Ok((credential, rev_reg, delta))
+    })
+    .map_py_err()?;
+    Ok((
+        PyCredential::embed_json(py, &credential)?,
+        rev_reg.map(|reg| PyRevocationRegistry::from(reg)),
+        delta.map(|delta| PyRevocationRegistryDelta::from(delta)),
+    ))
+}
+
+fn revocation_config<'a>(
+    rev_reg_def: Option<&'a RevocationRegistryDefinition>,
+    rev_reg: Option<&'a RevocationRegistry>,
+    rev_reg_key: Option<&'a RevocationKeyPrivate>,
+    rev_reg_idx: Option<u32>,
+    tails: Option<&PyTailsArg>,
+) -> PyResult<Option<CredentialRevocationConfig<'a>>> {
+    match (rev_reg_def, rev_reg, rev_reg_key, rev_reg_idx, tails) {
+        (None, None, None, None, None) => Ok(None),
+        (Some(reg_def), Some(registry), Some(registry_key), Some(registry_idx), Some(tails)) => {
+            Ok(Some(CredentialRevocationConfig {
                 reg_def,
                 registry,
                 registry_key,
                 registry_idx,
-                tails_reader: TailsFileReader::new(path.as_str()),
-            })
+                tails_reader: tails.reader(),
+            }))
+        }
+        _ => Err(PyErr::new::<ValueError, _>(
+            "Must provide all or none of the revocation parameters",
+        )),
+    }
+}
+
+#[pyfunction]
+/// Creates a batch of credentials for a single credential definition
+///
+/// Each job is a tuple of (cred_offer, cred_request, cred_values, rev_reg_idx).
+/// The jobs are issued in parallel against the same revocation registry state,
+/// so only `ISSUANCE_BY_DEFAULT` registries are accepted: issuing into them
+/// leaves the registry unchanged. Returns the list of issued credentials.
+pub fn create_credentials_batch(
+    py: Python,
+    cred_def: PyAcceptJsonArg<PyCredentialDefinition>,
+    cred_private_key: PyAcceptBufferArg<PyCredentialPrivateKey>,
+    jobs: Vec<(
+        PyAcceptJsonArg<PyCredentialOffer>,
+        PyAcceptJsonArg<PyCredentialRequest>,
+        PyAcceptJsonArg<PyCredentialValues>,
+        Option<u32>,
+    )>,
+    rev_reg_def: Option<PyAcceptJsonArg<PyRevocationRegistryDefinition>>,
+    rev_reg: Option<PyAcceptJsonArg<PyRevocationRegistry>>,
+    rev_reg_key: Option<PyAcceptBufferArg<PyRevocationPrivateKey>>,
+    tails: Option<PyTailsArg>,
+) -> PyResult<Vec<PyCredential>> {
+    let cred_private_key = &cred_private_key.extract_json(py)?;
+    let rev_reg_key = rev_reg_key.map(|key| key.extract_json(py)).transpose()?;
+    let revocation = match (&rev_reg_def, &rev_reg, &rev_reg_key, &tails) {
+        (None, None, None, None) => None,
+        (Some(reg_def), Some(registry), Some(registry_key), Some(tails)) => {
+            Some((&***reg_def, &***registry, registry_key, tails))
         }
         _ => {
             return Err(PyErr::new::<ValueError, _>(
@@ -111,23 +309,67 @@ pub fn create_credential(
             ))
         }
     };
-    let (credential, rev_reg, delta) = py
-        .allow_threads(move || {
-            Issuer::new_credential(
-                &cred_def,
-                &cred_private_key,
-                &cred_offer,
-                &cred_request,
-                &cred_values,
-                revocation_config,
-            )
-        })
-        .map_py_err()?;
-    Ok((
-        PyCredential::embed_json(py, &credential)?,
-        rev_reg.map(|reg| PyRevocationRegistry::from(reg)),
-        delta.map(|delta| PyRevocationRegistryDelta::from(delta)),
-    ))
+    if let Some((reg_def, _, _, _)) = revocation {
+        let issuance_type = match reg_def {
+            RevocationRegistryDefinition::RevocationRegistryDefinitionV1(v1) => {
+                &v1.value.issuance_type
+            }
+        };
+        if *issuance_type != IssuanceType::ISSUANCE_BY_DEFAULT {
+            return Err(PyErr::new::<ValueError, _>(
+                "Batch issuance requires an ISSUANCE_BY_DEFAULT revocation registry",
+            ));
+        }
+    }
+    if jobs
+        .iter()
+        .any(|(_, _, _, rev_reg_idx)| rev_reg_idx.is_some() != revocation.is_some())
+    {
+        return Err(PyErr::new::<ValueError, _>(
+            "Revocation registry index must be provided for each job if and only if \
+            revocation parameters are provided",
+        ));
+    }
+    let mut seen_idx = HashSet::new();
+    if !jobs
+        .iter()
+        .filter_map(|(_, _, _, rev_reg_idx)| *rev_reg_idx)
+        .all(|rev_reg_idx| seen_idx.insert(rev_reg_idx))
+    {
+        return Err(PyErr::new::<ValueError, _>(
+            "Duplicate revocation registry index in batch",
+        ));
+    }
+    let credentials = run_threaded(py, move || {
+        jobs.into_par_iter()
+            .map(|(cred_offer, cred_request, cred_values, rev_reg_idx)| {
+                let revocation_config =
+                    revocation.map(|(reg_def, registry, registry_key, tails)| {
+                        CredentialRevocationConfig {
+                            reg_def,
+                            registry,
+                            registry_key,
+                            registry_idx: rev_reg_idx.unwrap_or_default(),
+                            tails_reader: tails.reader(),
+                        }
+                    });
+                let (credential, _, _) = Issuer::new_credential(
+                    &cred_def,
+                    &cred_private_key,
+                    &cred_offer,
+                    &cred_request,
+                    &cred_values,
+                    revocation_config,
+                )?;
+                Ok(credential)
+            })
+            .collect::<IndyResult<Vec<_>>>()
+    })
+    .map_py_err()?;
+    credentials
+        .iter()
+        .map(|credential| PyCredential::embed_json(py, credential))
+        .collect()
 }
 
 #[pyfunction]
@@ -142,24 +384,26 @@ pub fn process_credential(
 ) -> PyResult<PyCredential> {
     let mut credential = cred.extract_json(py)?;
     let master_secret = master_secret.extract_json(py)?;
-    let credential = py
-        .allow_threads(move || {
-            Prover::process_credential(
-                &mut credential,
-                &cred_request_metadata,
-                &master_secret,
-                &cred_def,
-                rev_reg_def.as_ref().map(|def| &def.inner),
-            )
-            .and(Ok(credential))
-        })
-        .map_py_err()?;
+    let credential = run_threaded(py, move || {
+        Prover::process_credential(
+            &mut credential,
+            &cred_request_metadata,
+            &master_secret,
+            &cred_def,
+            rev_reg_def.as_ref().map(|def| &def.inner),
+        )
+        .and(Ok(credential))
+    })
+    .map_py_err()?;
     Ok(PyCredential::embed_json(py, &credential)?)
 }
 
 pub fn register(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(create_credential))?;
+    m.add_wrapped(wrap_pyfunction!(create_credentials_batch))?;
+    m.add_wrapped(wrap_pyfunction!(issue_and_process))?;
     m.add_wrapped(wrap_pyfunction!(process_credential))?;
     m.add_class::<PyCredential>()?;
+    m.add_class::<PyCredentialValues>()?;
     Ok(())
 }
@@ -15,7 +15,7 @@ use indy_credx::utils::validation::Validatable;
 
 use crate::buffer::PySafeBuffer;
 use crate::error::PyIndyResult;
-use crate::helpers::{PyAcceptJsonArg, PyJsonArg, PyJsonSafeBuffer};
+use crate::helpers::{run_threaded, PyAcceptJsonArg, PyJsonArg, PyJsonSafeBuffer};
 use crate::schema::PySchema;
 
 #[pyclass(name=CredentialDefinition)]
@@ -177,17 +177,16 @@ pub fn create_credential_definition(
         .map(|cfg| cfg.clone())
         .unwrap_or_else(|| CredentialDefinitionConfig::default());
     let signature_type = SignatureType::from_str(&signature_type).map_py_err()?;
-    let (cred_def, private_key, correctness_proof) = py
-        .allow_threads(move || {
-            Issuer::new_credential_definition(
-                &origin_did,
-                &schema,
-                tag.as_str(),
-                signature_type,
-                config,
-            )
-        })
-        .map_py_err()?;
+    let (cred_def, private_key, correctness_proof) = run_threaded(py, move || {
+        Issuer::new_credential_definition(
+            &origin_did,
+            &schema,
+            tag.as_str(),
+            signature_type,
+            config,
+        )
+    })
+    .map_py_err()?;
     let args: &[PyObject; 3] = &[
         PyCredentialDefinition { inner: cred_def }.into_py(py),
         PyCredentialPrivateKey::embed_json(py, &private_key)?.into_py(py),
@@ -202,6 +201,7 @@ pub fn create_credential_definition(
 pub fn register(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(create_credential_definition))?;
     m.add_class::<PyCredentialDefinition>()?;
+    m.add_class::<PyCredentialPrivateKey>()?;
     m.add_class::<PyCredentialKeyCorrectnessProof>()?;
     Ok(())
 }
@@ -11,7 +11,7 @@ use indy_credx::utils::validation::Validatable;
 use crate::cred_def::PyCredentialDefinition;
 use crate::cred_offer::PyCredentialOffer;
 use crate::error::PyIndyResult;
-use crate::helpers::{PyAcceptBufferArg, PyAcceptJsonArg, PyJsonSafeBuffer};
+use crate::helpers::{run_threaded, PyAcceptBufferArg, PyAcceptJsonArg, PyJsonSafeBuffer};
 use crate::master_secret::PyMasterSecret;
 
 #[pyclass(name=CredentialRequest)]
@@ -110,17 +110,16 @@ fn create_credential_request(
     prover_did.validate().map_py_err()?;
     let master_secret = &master_secret.extract_json(py)?;
 
-    let (request, metadata) = py
-        .allow_threads(move || {
-            Prover::new_credential_request(
-                &prover_did,
-                &cred_def,
-                &master_secret,
-                master_secret_id.as_str(),
-                &cred_offer,
-            )
-        })
-        .map_py_err()?;
+    let (request, metadata) = run_threaded(py, move || {
+        Prover::new_credential_request(
+            &prover_did,
+            &cred_def,
+            &master_secret,
+            master_secret_id.as_str(),
+            &cred_offer,
+        )
+    })
+    .map_py_err()?;
     let args: &[PyObject; 2] = &[
         PyCredentialRequest::from(request).into_py(py),
         PyCredentialRequestMetadata::from(metadata).into_py(py),
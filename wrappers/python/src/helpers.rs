@@ -8,6 +8,22 @@ use pyo3::PyTypeInfo;
 use crate::buffer::PySafeBuffer;
 use crate::error::PyIndyResult;
 
+lazy_static! {
+    static ref THREAD_POOL: rayon::ThreadPool = rayon::ThreadPoolBuilder::new()
+        .thread_name(|idx| format!("indy-credx-{}", idx))
+        .build()
+        .expect("Error creating thread pool");
+}
+
+/// Release the GIL and run a blocking operation on the shared worker pool
+pub fn run_threaded<F, T>(py: Python, f: F) -> T
+where
+    F: FnOnce() -> T + Send,
+    T: Send,
+{
+    py.allow_threads(move || THREAD_POOL.install(f))
+}
+
 pub enum PyArg<'a, T, M = T> {
     Owned(T, PhantomData<M>),
     Ref(&'a T, PhantomData<M>),
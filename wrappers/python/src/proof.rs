@@ -11,15 +11,15 @@ use indy_credx::domain::requested_credential::RequestedCredentials;
 use indy_credx::identifiers::cred_def::CredentialDefinitionId;
 use indy_credx::identifiers::rev_reg::RevocationRegistryId;
 use indy_credx::identifiers::schema::SchemaId;
-use indy_credx::services::new_nonce;
 use indy_credx::services::prover::Prover;
 use indy_credx::services::verifier::Verifier;
+use indy_credx::services::{new_nonce, MasterSecret};
 
 use crate::buffer::PySafeBuffer;
 use crate::cred::PyCredential;
 use crate::cred_def::PyCredentialDefinition;
 use crate::error::PyIndyResult;
-use crate::helpers::{PyAcceptBufferArg, PyAcceptJsonArg, PyJsonArg, PyJsonSafeBuffer};
+use crate::helpers::{run_threaded, PyAcceptBufferArg, PyAcceptJsonArg, PyJsonSafeBuffer};
 use crate::master_secret::PyMasterSecret;
 use crate::rev_reg::{PyRevocationRegistry, PyRevocationRegistryDefinition, PyRevocationState};
 use crate::schema::PySchema;
@@ -107,19 +107,60 @@ impl std::ops::Deref for PyProofRequest {
     }
 }
 
+#[pyclass(name=RequestedCredentials)]
+#[derive(Serialize, Deserialize)]
+#[serde(transparent)]
+pub struct PyRequestedCredentials {
+    pub inner: RequestedCredentials,
+}
+
+#[pymethods]
+impl PyRequestedCredentials {
+    #[classmethod]
+    pub fn from_json(_cls: &PyType, json: &PyString) -> PyResult<Self> {
+        let inner = serde_json::from_str::<RequestedCredentials>(&json.to_string()?)
+            .map_py_err_msg(|| "Error parsing requested credentials JSON")?;
+        Ok(Self { inner })
+    }
+
+    pub fn to_json(&self) -> PyResult<String> {
+        Ok(serde_json::to_string(&self.inner).map_py_err()?)
+    }
+}
+
+#[pyproto]
+impl PyObjectProtocol for PyRequestedCredentials {
+    fn __repr__(&self) -> PyResult<String> {
+        Ok(format!("RequestedCredentials({:p})", self))
+    }
+}
+
+impl From<RequestedCredentials> for PyRequestedCredentials {
+    fn from(value: RequestedCredentials) -> Self {
+        Self { inner: value }
+    }
+}
+
+impl std::ops::Deref for PyRequestedCredentials {
+    type Target = RequestedCredentials;
+    fn deref(&self) -> &Self::Target {
+        &self.inner
+    }
+}
+
 #[pyfunction]
 /// Creates a new proof
 pub fn create_proof(
     py: Python,
     proof_req: PyAcceptJsonArg<PyProofRequest>,
     credentials: HashMap<String, PyAcceptBufferArg<PyCredential>>,
-    requested_credentials: PyJsonArg<RequestedCredentials>,
+    requested_credentials: PyAcceptJsonArg<PyRequestedCredentials>,
     master_secret: PyAcceptBufferArg<PyMasterSecret>,
     schemas: HashMap<String, PyAcceptJsonArg<PySchema>>,
     cred_defs: HashMap<String, PyAcceptJsonArg<PyCredentialDefinition>>,
     rev_states: Option<HashMap<String, Vec<PyAcceptJsonArg<PyRevocationState>>>>,
 ) -> PyResult<PyProof> {
-    let master_secret = master_secret.extract_json(py)?;
+    let master_secret = master_secret.inner.as_ref(py);
     let credentials =
         credentials
             .into_iter()
@@ -148,19 +189,19 @@ pub fn create_proof(
     } else {
         HashMap::new()
     };
-    let proof = py
-        .allow_threads(move || {
-            Prover::create_proof(
-                &proof_req,
-                &credentials,
-                &requested_credentials,
-                &master_secret,
-                &schema_refs,
-                &cred_def_refs,
-                &rev_state_refs,
-            )
-        })
-        .map_py_err()?;
+    let proof = run_threaded(py, move || {
+        let master_secret = master_secret.deserialize::<MasterSecret>()?;
+        Prover::create_proof(
+            &proof_req,
+            &credentials,
+            &requested_credentials,
+            &master_secret,
+            &schema_refs,
+            &cred_def_refs,
+            &rev_state_refs,
+        )
+    })
+    .map_py_err()?;
     Ok(PyProof::embed_json(py, &proof)?)
 }
 
@@ -214,18 +255,17 @@ pub fn verify_proof(
     } else {
         HashMap::new()
     };
-    let verified = py
-        .allow_threads(move || {
-            Verifier::verify_proof(
-                &proof,
-                &proof_req,
-                &schema_refs,
-                &cred_def_refs,
-                &rev_reg_def_refs,
-                &rev_reg_refs,
-            )
-        })
-        .map_py_err()?;
+    let verified = run_threaded(py, move || {
+        Verifier::verify_proof(
+            &proof,
+            &proof_req,
+            &schema_refs,
+            &cred_def_refs,
+            &rev_reg_def_refs,
+            &rev_reg_refs,
+        )
+    })
+    .map_py_err()?;
     Ok(verified)
 }
 
@@ -235,5 +275,6 @@ pub fn register(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(verify_proof))?;
     m.add_class::<PyProof>()?;
     m.add_class::<PyProofRequest>()?;
+    m.add_class::<PyRequestedCredentials>()?;
     Ok(())
 }
@@ -1,7 +1,8 @@
 use pyo3::class::PyObjectProtocol;
 use pyo3::prelude::*;
-use pyo3::types::{PyString, PyType};
+use pyo3::types::{PyAny, PyString, PyType};
 use pyo3::wrap_pyfunction;
+use pyo3::PyTypeInfo;
 
 use std::collections::HashSet;
 use std::iter::FromIterator;
@@ -16,14 +17,14 @@ use indy_credx::domain::revocation_registry_delta::RevocationRegistryDelta;
 use indy_credx::domain::revocation_state::RevocationState;
 use indy_credx::services::issuer::Issuer;
 use indy_credx::services::prover::Prover;
-use indy_credx::services::tails::{TailsFileReader, TailsFileWriter};
+use indy_credx::services::tails::{TailsFileMap, TailsFileReader, TailsFileWriter, TailsReader};
 use indy_credx::services::RevocationKeyPrivate;
 use indy_credx::utils::validation::Validatable;
 
 use crate::buffer::PySafeBuffer;
 use crate::cred_def::PyCredentialDefinition;
 use crate::error::PyIndyResult;
-use crate::helpers::{PyAcceptJsonArg, PyJsonSafeBuffer};
+use crate::helpers::{run_threaded, PyAcceptJsonArg, PyJsonSafeBuffer};
 
 #[pyclass(name=RevocationRegistry)]
 #[serde(transparent)]
@@ -234,6 +235,16 @@ impl PyRevocationState {
         self.inner.timestamp
     }
 
+    /// Copy the revocation state for a new timestamp, reusing the witness
+    ///
+    /// Only valid when the revocation registry is unchanged since the state
+    /// was created or last updated.
+    pub fn with_timestamp(&self, timestamp: u64) -> Self {
+        let mut inner = self.inner.clone();
+        inner.timestamp = timestamp;
+        Self { inner }
+    }
+
     #[classmethod]
     pub fn from_json(_cls: &PyType, json: &PyString) -> PyResult<Self> {
         let inner = serde_json::from_str::<RevocationState>(&json.to_string()?)
@@ -266,6 +277,59 @@ impl std::ops::Deref for PyRevocationState {
     }
 }
 
+#[pyclass(name=TailsReader)]
+pub struct PyTailsReader {
+    pub inner: TailsFileMap,
+}
+
+#[pymethods]
+impl PyTailsReader {
+    #[new]
+    pub fn new(path: &str) -> PyResult<Self> {
+        let inner = TailsFileMap::open(path)
+            .map_py_err_msg(|| format!("Error opening tails file: {}", path))?;
+        Ok(Self { inner })
+    }
+
+    #[getter]
+    pub fn path(&self) -> String {
+        self.inner.path().to_owned()
+    }
+}
+
+#[pyproto]
+impl PyObjectProtocol for PyTailsReader {
+    fn __repr__(&self) -> PyResult<String> {
+        Ok(format!("TailsReader({})", self.inner.path()))
+    }
+}
+
+/// A tails file argument, accepting either a file path or a TailsReader
+pub enum PyTailsArg {
+    Path(String),
+    Mapped(TailsFileMap),
+}
+
+impl PyTailsArg {
+    pub fn reader(&self) -> TailsReader {
+        match self {
+            Self::Path(path) => TailsFileReader::new(path.as_str()),
+            Self::Mapped(tails) => tails.reader(),
+        }
+    }
+}
+
+impl<'a> FromPyObject<'a> for PyTailsArg {
+    fn extract(arg: &'a PyAny) -> PyResult<Self> {
+        if PyTailsReader::is_instance(arg) {
+            let tails = <PyTailsReader as PyTryFrom>::try_from(arg)?;
+            Ok(Self::Mapped(tails.inner.clone()))
+        } else {
+            Ok(Self::Path(arg.extract()?))
+        }
+    }
+}
+
 #[pyfunction]
 /// Creates a new revocation registry
 fn create_revocation_registry(
@@ -293,19 +357,18 @@ fn create_revocation_registry(
         .unwrap_or(IssuanceType::ISSUANCE_BY_DEFAULT);
     let tag = tag.unwrap_or_else(|| "default".to_owned()); // FIXME
     let mut tails_writer = TailsFileWriter::new(tails_dir_path);
-    let (rev_reg_def, rev_reg, rev_private_key) = py
-        .allow_threads(move || {
-            Issuer::new_revocation_registry(
-                &origin_did,
-                &cred_def,
-                tag.as_str(),
-                rev_reg_type,
-                issuance_type,
-                max_cred_num,
-                &mut tails_writer,
-            )
-        })
-        .map_py_err_msg(|| "Error creating revocation registry")?; // FIXME combine error
+    let (rev_reg_def, rev_reg, rev_private_key) = run_threaded(py, move || {
+        Issuer::new_revocation_registry(
+            &origin_did,
+            &cred_def,
+            tag.as_str(),
+            rev_reg_type,
+            issuance_type,
+            max_cred_num,
+            &mut tails_writer,
+        )
+    })
+    .map_py_err_msg(|| "Error creating revocation registry")?; // FIXME combine error
     let init_delta = PyRevocationRegistryDelta::from(rev_reg.initial_delta());
     Ok((
         PyRevocationRegistryDefinition::from(rev_reg_def),
@@ -323,22 +386,21 @@ fn create_or_update_revocation_state(
     rev_reg_delta: PyAcceptJsonArg<PyRevocationRegistryDelta>,
     rev_reg_idx: u32,
     timestamp: u64,
-    tails_file_path: String,
+    tails: PyTailsArg,
     rev_state: Option<PyAcceptJsonArg<PyRevocationState>>,
 ) -> PyResult<PyRevocationState> {
     let rev_state = rev_state.map(|state| state.clone());
-    let rev_state = py
-        .allow_threads(move || {
-            Prover::create_or_update_revocation_state(
-                TailsFileReader::new(tails_file_path.as_str()),
-                &revoc_reg_def,
-                &rev_reg_delta,
-                rev_reg_idx,
-                timestamp,
-                rev_state,
-            )
-        })
-        .map_py_err()?;
+    let rev_state = run_threaded(py, move || {
+        Prover::create_or_update_revocation_state(
+            tails.reader(),
+            &revoc_reg_def,
+            &rev_reg_delta,
+            rev_reg_idx,
+            timestamp,
+            rev_state,
+        )
+    })
+    .map_py_err()?;
     Ok(PyRevocationState::from(rev_state))
 }
 
@@ -350,22 +412,15 @@ fn update_revocation_registry(
     rev_reg: PyAcceptJsonArg<PyRevocationRegistry>,
     issued: Option<Vec<u32>>,
     revoked: Option<Vec<u32>>,
-    tails_file_path: String,
+    tails: PyTailsArg,
 ) -> PyResult<(PyRevocationRegistry, PyRevocationRegistryDelta)> {
-    let (rev_reg, rev_reg_delta) = py
-        .allow_threads(move || {
-            let issued = HashSet::from_iter(issued.unwrap_or_else(|| vec![]).into_iter());
-            let revoked = HashSet::from_iter(revoked.unwrap_or_else(|| vec![]).into_iter());
-            let tails_reader = TailsFileReader::new(tails_file_path.as_str());
-            Issuer::update_revocation_registry(
-                &rev_reg_def,
-                &rev_reg,
-                issued,
-                revoked,
-                &tails_reader,
-            )
-        })
-        .map_py_err_msg(|| "Error updating revocation registry")?; // FIXME combine error
+    let (rev_reg, rev_reg_delta) = run_threaded(py, move || {
+        let issued = HashSet::from_iter(issued.unwrap_or_else(|| vec![]).into_iter());
+        let revoked = HashSet::from_iter(revoked.unwrap_or_else(|| vec![]).into_iter());
+        let tails_reader = tails.reader();
+        Issuer::update_revocation_registry(&rev_reg_def, &rev_reg, issued, revoked, &tails_reader)
+    })
+    .map_py_err_msg(|| "Error updating revocation registry")?; // FIXME combine error
     Ok((
         PyRevocationRegistry::from(rev_reg),
         PyRevocationRegistryDelta::from(rev_reg_delta),
@@ -390,14 +445,13 @@ fn revoke_credential(
     rev_reg: PyAcceptJsonArg<PyRevocationRegistry>,
     max_cred_num: u32,
     rev_reg_idx: u32,
-    tails_file_path: String,
+    tails: PyTailsArg,
 ) -> PyResult<(PyRevocationRegistry, PyRevocationRegistryDelta)> {
-    let (rev_reg, rev_reg_delta) = py
-        .allow_threads(move || {
-            let tails_reader = TailsFileReader::new(tails_file_path.as_str());
-            Issuer::revoke_credential(&rev_reg, max_cred_num, rev_reg_idx, &tails_reader)
-        })
-        .map_py_err_msg(|| "Error revoking credential revocation registry")?; // FIXME combine error
+    let (rev_reg, rev_reg_delta) = run_threaded(py, move || {
+        let tails_reader = tails.reader();
+        Issuer::revoke_credential(&rev_reg, max_cred_num, rev_reg_idx, &tails_reader)
+    })
+    .map_py_err_msg(|| "Error revoking credential revocation registry")?; // FIXME combine error
     Ok((
         PyRevocationRegistry::from(rev_reg),
         PyRevocationRegistryDelta::from(rev_reg_delta),
@@ -412,6 +466,8 @@ pub fn register(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(revoke_credential))?;
     m.add_class::<PyRevocationRegistry>()?;
     m.add_class::<PyRevocationRegistryDefinition>()?;
+    m.add_class::<PyRevocationRegistryDelta>()?;
     m.add_class::<PyRevocationPrivateKey>()?;
+    m.add_class::<PyTailsReader>()?;
     Ok(())
 }
@@ -1,13 +1,38 @@
+import hashlib
 import json
-import math
+import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
-from time import perf_counter, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from time import perf_counter, perf_counter_ns, time
+from typing import Optional
+
+try:
+    import orjson
+
+    def json_dumps(value) -> str:
+        return orjson.dumps(value).decode()
+
+except ImportError:
+    json_dumps = json.dumps
 
 os.environ.setdefault("RUST_LOG", "debug")
 
+log = logging.getLogger(__name__)
+
 from indy_credx_py import (  # noqa: E402
+    CredentialDefinition,
+    CredentialKeyCorrectnessProof,
+    CredentialPrivateKey,
+    CredentialValues,
+    ProofRequest,
+    RequestedCredentials,
+    RevocationPrivateKey,
+    RevocationRegistry,
+    RevocationRegistryDefinition,
+    RevocationRegistryDelta,
+    TailsReader,
     create_credential,
+    create_credentials_batch,
     create_credential_definition,
     create_credential_offer,
     create_credential_request,
@@ -17,7 +42,7 @@ from indy_credx_py import (  # noqa: E402
     create_revocation_registry,
     create_schema,
     generate_nonce,
-    process_credential,
+    issue_and_process,
     # update_revocation_registry,
     verify_proof,
 )
@@ -27,14 +52,10 @@ schema = create_schema(origin_did, "schema_name", "1.0", ["one", "two"])
 schema.seq_no = 15
 print("schema", schema.schema_id, schema)
 
-(cred_def, cred_def_pk, cred_def_cp) = create_credential_definition(
-    origin_did, schema, "CL", None, json.dumps({"support_revocation": True})
-)
-print("cred def", cred_def)
-print("cred def private key", cred_def_pk)
-print("cred def correctness proof", cred_def_cp)
-
 if 0:
+    (cred_def, cred_def_pk, cred_def_cp) = create_credential_definition(
+        origin_did, schema, "CL", None, json_dumps({"support_revocation": True})
+    )
     reps = 5
     start = perf_counter()
     for i in range(reps):
@@ -43,11 +64,134 @@ if 0:
         )
     print("avg duration", (perf_counter() - start) / reps)
     raise SystemExit
-else:
+
+
+CRED_DEF_TAG = "CL"
+CRED_DEF_CONFIG = {"support_revocation": True}
+REV_REG_TYPE = "CL_ACCUM"
+
+
+def create_issuer(max_cred_num: int, issuance_type: str, tails_dir: Optional[str]):
+    (cred_def, cred_def_pk, cred_def_cp) = create_credential_definition(
+        origin_did, schema, CRED_DEF_TAG, None, json_dumps(CRED_DEF_CONFIG)
+    )
     (rev_reg_def, rev_reg, rev_init_delta, rev_key) = create_revocation_registry(
-        origin_did, cred_def, "CL_ACCUM", None, 1000, "ISSUANCE_BY_DEFAULT", None
+        origin_did,
+        cred_def,
+        REV_REG_TYPE,
+        None,
+        max_cred_num,
+        issuance_type,
+        tails_dir,
+    )
+    return (
+        cred_def,
+        cred_def_pk,
+        cred_def_cp,
+        rev_reg_def,
+        rev_reg,
+        rev_init_delta,
+        rev_key,
+    )
+
+
+def load_issuer(cache_path: str):
+    with open(cache_path) as cache_file:
+        cached = json.load(cache_file)
+    rev_reg_def = RevocationRegistryDefinition.from_json(cached["rev_reg_def"])
+    if not os.path.exists(rev_reg_def.tails_location):
+        raise FileNotFoundError(rev_reg_def.tails_location)
+    return (
+        CredentialDefinition.from_json(cached["cred_def"]),
+        CredentialPrivateKey.from_json(cached["cred_def_pk"]),
+        CredentialKeyCorrectnessProof.from_json(cached["cred_def_cp"]),
+        rev_reg_def,
+        RevocationRegistry.from_json(cached["rev_reg"]),
+        RevocationRegistryDelta.from_json(cached["rev_init_delta"]),
+        RevocationPrivateKey.from_json(cached["rev_key"]),
     )
-    print(rev_reg_def, rev_reg.to_json(), rev_key.to_json())
+
+
+def dump_issuer(cache_path: str, issuer):
+    names = (
+        "cred_def",
+        "cred_def_pk",
+        "cred_def_cp",
+        "rev_reg_def",
+        "rev_reg",
+        "rev_init_delta",
+        "rev_key",
+    )
+    # the cache holds private keys: write it owner-only, then move it into place
+    tmp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(
+                {name: obj.to_json() for name, obj in zip(names, issuer)}, cache_file
+            )
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+max_cred_num = 1000
+issuance_type = "ISSUANCE_BY_DEFAULT"
+
+# set INDY_CREDX_TEST_CACHE=1 to reuse the issuer setup between runs. The
+# registry keys are derived from the credential definition keys, so both are
+# cached together, along with the tails file, in a directory private to the
+# current user
+if os.environ.get("INDY_CREDX_TEST_CACHE"):
+    # canonical encoding, so the key does not depend on the JSON encoder in use
+    cache_key = hashlib.sha256(
+        json.dumps(
+            [
+                origin_did,
+                schema.schema_id,
+                schema.seq_no,
+                CRED_DEF_TAG,
+                CRED_DEF_CONFIG,
+                REV_REG_TYPE,
+                max_cred_num,
+                issuance_type,
+            ],
+            sort_keys=True,
+            separators=(",", ":"),
+        ).encode()
+    ).hexdigest()[:16]
+    cache_dir = os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "indy_credx",
+    )
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    os.chmod(cache_dir, 0o700)
+    cache_path = os.path.join(cache_dir, "revreg_{}.json".format(cache_key))
+    try:
+        issuer = load_issuer(cache_path)
+    except (OSError, ValueError, KeyError) as e:
+        log.debug("issuer cache miss: %s", e)
+        issuer = create_issuer(max_cred_num, issuance_type, cache_dir)
+        dump_issuer(cache_path, issuer)
+else:
+    issuer = create_issuer(max_cred_num, issuance_type, None)
+(
+    cred_def,
+    cred_def_pk,
+    cred_def_cp,
+    rev_reg_def,
+    rev_reg,
+    rev_init_delta,
+    rev_key,
+) = issuer
+
+print("cred def", cred_def)
+print("cred def private key", cred_def_pk)
+print("cred def correctness proof", cred_def_cp)
+print(rev_reg_def, rev_reg.to_json(), rev_key.to_json())
+
+tails = TailsReader(rev_reg_def.tails_location)
 
 cred_offer = create_credential_offer(schema.schema_id, cred_def, cred_def_cp)
 print(cred_offer)
@@ -60,135 +204,182 @@ master_secret_id = "default"
 )
 print(cred_req, cred_req_metadata)
 
-
-def make_cred(rev_idx: int):
-    cred_values = json.dumps(
+CRED_VALUES = CredentialValues.from_json(
+    json_dumps(
         {
             "one": {"raw": "oneval", "encoded": "1"},
             "two": {"raw": "twoval", "encoded": "2"},
         }
     )
+)
+
+SCHEMAS = {schema.schema_id: schema}
+CRED_DEFS = {cred_def.cred_def_id: cred_def}
+REV_REG_DEFS = {rev_reg_def.rev_reg_def_id: rev_reg_def}
 
-    print("tails", rev_reg_def.tails_location)
+_REV_STATE_CACHE = {}
 
+
+def make_cred(rev_idx: int):
     return create_credential(
         cred_def,
         cred_def_pk,
         cred_offer,
         cred_req,
-        cred_values,
+        CRED_VALUES,
         rev_reg_def,
         rev_reg,
         rev_key,
         rev_idx,
-        rev_reg_def.tails_location,
+        tails,
     )
 
 
 def make_and_prove_cred():
-    cred, upd_rev_reg, delta = make_cred(1)
-    cred_revcd = process_credential(
-        cred, cred_req_metadata, master_secret, cred_def, rev_reg_def
+    cred_revcd, upd_rev_reg, delta = issue_and_process(
+        cred_def,
+        cred_def_pk,
+        cred_offer,
+        cred_req,
+        cred_req_metadata,
+        master_secret,
+        CRED_VALUES,
+        rev_reg_def,
+        rev_reg,
+        rev_key,
+        1,
+        tails,
     )
-    schemas = {schema.schema_id: schema}
-    cred_defs = {cred_def.cred_def_id: cred_def}
-    rev_reg_defs = {rev_reg_def.rev_reg_def_id: rev_reg_def}
     timestamp = int(time())
     rev_regs = {rev_reg_def.rev_reg_def_id: {timestamp: rev_reg}}
 
     creds = {"test-cred-id": cred_revcd}
-    proof_req = json.dumps(
-        {
-            "name": "proof",
-            "version": "1.0",
-            "nonce": generate_nonce(),
-            "requested_attributes": {
-                "reft": {
-                    "name": "one",
-                    "non_revoked": {"from": timestamp, "to": timestamp},
-                }
-            },
-            "requested_predicates": {},
-            "non_revoked": {"from": timestamp, "to": timestamp},
-            "ver": "1.0",
-        }
+    proof_req = ProofRequest.from_json(
+        json_dumps(
+            {
+                "name": "proof",
+                "version": "1.0",
+                "nonce": generate_nonce(),
+                "requested_attributes": {
+                    "reft": {
+                        "name": "one",
+                        "non_revoked": {"from": timestamp, "to": timestamp},
+                    }
+                },
+                "requested_predicates": {},
+                "non_revoked": {"from": timestamp, "to": timestamp},
+                "ver": "1.0",
+            }
+        )
     )
 
-    print(cred_revcd.to_json())
-    cred_rev_id = 1  # FIXME need accessor
+    cred_rev_id = cred_revcd.cred_rev_id
 
     # generate a delta from the registry (not using ledger)
     # (_, rev_delta) = update_revocation_registry(
     #     rev_reg_def, upd_rev_reg, (), (), rev_reg_def.tails_location
     # )
 
-    rev_states = {
-        rev_reg_def.rev_reg_def_id: [
-            create_or_update_revocation_state(
-                rev_reg_def,
-                rev_init_delta,
-                cred_rev_id,
-                timestamp,
-                rev_reg_def.tails_location,
-                None,
-            )
-        ]
-    }
-    print("rev state", rev_states[rev_reg_def.rev_reg_def_id][0].to_json())
+    # the registry is not updated, so the witness can be reused across proofs
+    rev_state_key = (rev_reg_def.rev_reg_def_id, cred_rev_id)
+    rev_state = _REV_STATE_CACHE.get(rev_state_key)
+    if rev_state is None:
+        rev_state = create_or_update_revocation_state(
+            rev_reg_def,
+            rev_init_delta,
+            cred_rev_id,
+            timestamp,
+            tails,
+            None,
+        )
+        _REV_STATE_CACHE[rev_state_key] = rev_state
+    elif rev_state.timestamp != timestamp:
+        rev_state = rev_state.with_timestamp(timestamp)
+    rev_states = {rev_reg_def.rev_reg_def_id: [rev_state]}
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("rev state %s", rev_state.to_json())
 
-    req_creds = json.dumps(
-        {
-            "self_attested_attributes": {},
-            "requested_attributes": {
-                "reft": {
-                    "cred_id": "test-cred-id",
-                    "revealed": True,
-                    "timestamp": timestamp,
-                }
-            },
-            "requested_predicates": {},
-        }
+    req_creds = RequestedCredentials.from_json(
+        json_dumps(
+            {
+                "self_attested_attributes": {},
+                "requested_attributes": {
+                    "reft": {
+                        "cred_id": "test-cred-id",
+                        "revealed": True,
+                        "timestamp": timestamp,
+                    }
+                },
+                "requested_predicates": {},
+            }
+        )
     )
 
     proof = create_proof(
-        proof_req, creds, req_creds, master_secret, schemas, cred_defs, rev_states
+        proof_req, creds, req_creds, master_secret, SCHEMAS, CRED_DEFS, rev_states
     )
-    print("proof:", proof.to_json())
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("proof %s", proof.to_json())
 
     print(
         "verified:",
-        verify_proof(proof, proof_req, schemas, cred_defs, rev_reg_defs, rev_regs),
+        verify_proof(proof, proof_req, SCHEMAS, CRED_DEFS, REV_REG_DEFS, rev_regs),
     )
 
-    return cred
+    return cred_revcd
 
 
 def make_many_creds(cred_count: int):
+    # the bindings release the GIL while issuing, so worker threads run in
+    # parallel; a process pool would fork after the Rust thread pool has started
     workers = 16
-    executor = ThreadPoolExecutor(workers)
+    progress = []
+    with ThreadPoolExecutor(workers) as executor:
+        start = perf_counter_ns()
+        pending = set()
+        for sent in range(1, cred_count + 1):
+            if len(pending) >= workers:
+                # check results as they finish so a failure stops the run, and
+                # drop completed credentials instead of holding them all
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            # indices wrap so runs larger than the registry reuse its slots
+            pending.add(executor.submit(make_cred, (sent - 1) % max_cred_num + 1))
+            if sent % 100 == 0:
+                progress.append((sent, perf_counter_ns()))
+        for future in as_completed(pending):
+            future.result()
+        # every credential has been issued here; joining the idle workers on
+        # exit is not part of the measurement
+        end = perf_counter_ns()
+    for sent, sent_ns in progress:
+        print("submitted", sent, (sent_ns - start) / 1e9)
+    ns_to_s = (end - start) / 1e9
+    print(ns_to_s, "avg:", ns_to_s / cred_count)
+
+
+def make_creds_batch(cred_count: int):
+    jobs = [
+        (cred_offer, cred_req, CRED_VALUES, rev_idx)
+        for rev_idx in range(1, cred_count + 1)
+    ]
     start = perf_counter()
-    futures = [executor.submit(make_cred) for i in range(min(cred_count, workers))]
-    sent = len(futures)
-    while futures:
-        (done, not_done) = wait(futures, timeout=None, return_when=FIRST_COMPLETED)
-        for check in done:
-            check.result()
-        add = min(cred_count - sent, workers - len(not_done))
-        if add:
-            futures = list(not_done) + list(
-                executor.submit(make_cred) for i in range(add)
-            )
-            prev = sent
-            sent += add
-            if math.floor(prev / 100) != math.floor(sent / 100):
-                print(sent)
-        else:
-            futures = not_done
+    create_credentials_batch(
+        cred_def,
+        cred_def_pk,
+        jobs,
+        rev_reg_def,
+        rev_reg,
+        rev_key,
+        tails,
+    )
     end = perf_counter()
     print(end - start, "avg:", ((end - start) / cred_count))
 
 
 make_and_prove_cred()
+make_creds_batch(100)
 
 print("done")
 